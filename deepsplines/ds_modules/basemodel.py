@@ -6,10 +6,12 @@ For using DeepSplines in other projects, the model should
 subclass DSModule() instead. (see dsnn.py).
 """
 
+import gc
 import torch
 import torch.nn as nn
-from torch import Tensor
+import torch.nn.functional as F
 
+from deepsplines.ds_modules.deepBspline_base import DeepBSplineBase
 from deepsplines.ds_modules.deepBspline import DeepBSpline
 from deepsplines.ds_modules.deepBspline_explicit_linear import (
     DeepBSplineExplicitLinear)
@@ -28,6 +30,7 @@ class BaseModel(nn.Module):
                  spline_init=None,
                  save_memory=False,
                  knot_threshold=None,
+                 use_cuda_graph=False,
                  **kwargs):
         """
         Args:
@@ -52,12 +55,21 @@ class BaseModel(nn.Module):
                 For deepBsplines: 'leaky_relu', 'relu' or 'even_odd';
                 For deepReLUspline: 'leaky_relu', 'relu'.
             save_memory (bool):
-                If true, use a more memory efficient version (takes more time);
+                If true, use a more memory efficient version, which only
+                saves the activation inputs for the backward pass (4 instead
+                of 13 bytes per element) and takes more time;
                 Can be used only with deepBsplines.
                 (see deepBspline_base.py docstring for details.)
             knot_threshold (non-negative float):
                 If nonzero, sparsify activations by eliminating knots whose
                 slope change is below this value.
+
+            ------ training ----------------------
+
+            use_cuda_graph (bool):
+                If true, capture the forward/backward pass of a training
+                batch in a CUDA graph and replay it at each step
+                (see forward_backward_cuda_graph()). Only used on GPU.
         """
         super().__init__()
 
@@ -74,6 +86,9 @@ class BaseModel(nn.Module):
         self.save_memory = save_memory
         self.knot_threshold = knot_threshold
 
+        # training attributes
+        self.use_cuda_graph = use_cuda_graph
+
         current_attr_names = dir(self)  # current attribute names
         # Get list of newly added attributes
         new_attr_names = list(set(current_attr_names) - set(past_attr_names))
@@ -91,6 +106,38 @@ class BaseModel(nn.Module):
         elif self.activation_type == 'deepReLUspline':
             self.deepspline = DeepReLUSpline
 
+        # lists of weights and biases, modules (by type) and ids of
+        # deepspline parameters, cached at first use
+        # (see weights_biases() and modules_by_type()).
+        self.reset_caches()
+        self.reset_cuda_graph()
+
+    def __setattr__(self, name, value):
+        """ Resets the caches when a submodule/parameter is (re)set. """
+        # also when a submodule/parameter is replaced by another value
+        # (e.g. self.fc = None)
+        reset = isinstance(value, (nn.Module, nn.Parameter)) or \
+            name in self.__dict__.get('_modules', {}) or \
+            name in self.__dict__.get('_parameters', {})
+        super().__setattr__(name, value)
+        if reset:
+            self.reset_caches()
+
+    def __delattr__(self, name):
+        """ Resets the caches when a submodule/parameter is deleted. """
+        super().__delattr__(name)
+        self.reset_caches()
+
+    def add_module(self, name, module):
+        """ Resets the caches when a submodule is added. """
+        super().add_module(name, module)
+        self.reset_caches()
+
+    def register_parameter(self, name, param):
+        """ Resets the caches when a parameter is registered. """
+        super().register_parameter(name, param)
+        self.reset_caches()
+
     @property
     def device(self):
         """
@@ -213,26 +260,26 @@ class BaseModel(nn.Module):
             else:
                 init_type = 'Xavier'  # overwrite init_type
 
-        for module in self.modules():
+        modules_by_type = self.modules_by_type()
 
-            if isinstance(module, nn.Conv2d):
-                if init_type == 'Xavier':
-                    nn.init.xavier_normal_(module.weight)
+        for module in modules_by_type['conv']:
+            if init_type == 'Xavier':
+                nn.init.xavier_normal_(module.weight)
 
-                elif init_type == 'custom_normal':
-                    # custom Gauss(0, 0.05) weight initialization
-                    module.weight.data.normal_(0, 0.05)
-                    module.bias.data.zero_()
+            elif init_type == 'custom_normal':
+                # custom Gauss(0, 0.05) weight initialization
+                module.weight.data.normal_(0, 0.05)
+                module.bias.data.zero_()
 
-                else:  # He initialization
-                    nn.init.kaiming_normal_(module.weight,
-                                            a=slope_init,
-                                            mode='fan_out',
-                                            nonlinearity=nonlinearity)
+            else:  # He initialization
+                nn.init.kaiming_normal_(module.weight,
+                                        a=slope_init,
+                                        mode='fan_out',
+                                        nonlinearity=nonlinearity)
 
-            elif isinstance(module, nn.BatchNorm2d):
-                module.weight.data.fill_(1)
-                module.bias.data.zero_()
+        for module in modules_by_type['batchnorm']:
+            module.weight.data.fill_(1)
+            module.bias.data.zero_()
 
     ###########################################################################
     # Parameters
@@ -241,19 +288,77 @@ class BaseModel(nn.Module):
         """
         Returns the total number of network parameters.
         """
-        num_params = 0
-        for param in self.parameters():
-            num_params += torch.numel(param)
-
-        return num_params
+        return sum(param.numel() for param in self.parameters())
+
+    def reset_caches(self):
+        """
+        Discards the cached lists of modules and parameters
+        (see modules_by_type(), is_deepspline_parameter(),
+        weights_biases() and deepspline_relu_slopes()), which are rebuilt
+        at the next use.
+
+        Called automatically when a submodule or parameter of the network
+        is set, replaced (e.g. by None), deleted or registered (add_module(),
+        register_parameter()). Must be called explicitly if modules are added
+        to (or removed from) a submodule in place after the first use
+        (e.g. self.layers.append(module)).
+        """
+        self._weights_biases = None
+        self._modules_by_type = None
+        self._deepspline_param_ids = None
+        self._deepsplines_share_grid = None
+
+    def modules_by_type(self):
+        """
+        Returns a dictionary with the lists of nn.Conv2d ('conv'),
+        nn.BatchNorm2d ('batchnorm'), nn.Linear ('linear') and deepspline
+        ('deepspline') modules in the network.
+
+        The lists are built with a single pass over the network modules
+        at the first call and cached.
+        """
+        if self._modules_by_type is None:
+            modules_by_type = {
+                'conv': [],
+                'batchnorm': [],
+                'linear': [],
+                'deepspline': []
+            }
+            for module in self.modules():
+                if isinstance(module, nn.Conv2d):
+                    modules_by_type['conv'].append(module)
+                elif isinstance(module, nn.BatchNorm2d):
+                    modules_by_type['batchnorm'].append(module)
+                elif isinstance(module, nn.Linear):
+                    modules_by_type['linear'].append(module)
+                elif self.using_deepsplines and \
+                        isinstance(module, self.deepspline):
+                    modules_by_type['deepspline'].append(module)
+
+            self._modules_by_type = modules_by_type
+
+        return self._modules_by_type
 
     def modules_deepspline(self):
         """
         Yields all deepspline modules in the network.
         """
-        for module in self.modules():
-            if isinstance(module, self.deepspline):
-                yield module
+        yield from self.modules_by_type()['deepspline']
+
+    def is_deepspline_parameter(self, param):
+        """
+        Returns True if param is a deepspline parameter, and False otherwise.
+
+        Args:
+            param (nn.Parameter)
+        """
+        if self._deepspline_param_ids is None:
+            self._deepspline_param_ids = set()
+            for module in self.modules_deepspline():
+                for module_param in module.parameters():
+                    self._deepspline_param_ids.add(id(module_param))
+
+        return id(param) in self._deepspline_param_ids
 
     def named_parameters_no_deepspline(self, recurse=True):
         """
@@ -261,13 +366,7 @@ class BaseModel(nn.Module):
         excepting deepspline parameters.
         """
         for name, param in self.named_parameters(recurse=recurse):
-            deepspline_param = False
-            # get all deepspline parameters
-            for param_name in self.deepspline.parameter_names():
-                if name.endswith(param_name):
-                    deepspline_param = True
-
-            if deepspline_param is False:
+            if not self.is_deepspline_parameter(param):
                 yield name, param
 
     def named_parameters_deepspline(self, recurse=True):
@@ -278,13 +377,7 @@ class BaseModel(nn.Module):
             raise ValueError('Not using deepspline activations...')
 
         for name, param in self.named_parameters(recurse=recurse):
-            deepspline_param = False
-            # get all deepspline parameters
-            for param_name in self.deepspline.parameter_names():
-                if name.endswith(param_name):
-                    deepspline_param = True
-
-            if deepspline_param is True:
+            if self.is_deepspline_parameter(param):
                 yield name, param
 
     def parameters_no_deepspline(self):
@@ -302,6 +395,27 @@ class BaseModel(nn.Module):
         for name, param in self.named_parameters_deepspline(recurse=True):
             yield param
 
+    def weights_biases(self):
+        """
+        Returns the list of weights and biases (nn.Parameter) of the
+        network modules.
+
+        The list is built at the first call and cached, since it is used
+        at every training step (see l2sqsum_weights_biases()).
+        """
+        if self._weights_biases is None:
+            self._weights_biases = []
+            for module in self.modules():
+                if hasattr(module, 'weight') and \
+                        isinstance(module.weight, nn.Parameter):
+                    self._weights_biases.append(module.weight)
+
+                if hasattr(module, 'bias') and \
+                        isinstance(module.bias, nn.Parameter):
+                    self._weights_biases.append(module.bias)
+
+        return self._weights_biases
+
     def freeze_parameters(self):
         """
         Freezes the network (no gradient computations).
@@ -309,6 +423,156 @@ class BaseModel(nn.Module):
         for param in self.parameters():
             param.requires_grad = False
 
+    ##########################################################################
+    # CUDA graph
+
+    def reset_cuda_graph(self):
+        """
+        Discards the captured CUDA graph (if any).
+
+        Required whenever the memory of the network parameters (or
+        buffers) is reallocated, since the graph replays the kernels on
+        fixed memory addresses. sparsify_activations() calls it; any
+        other code which moves or reallocates them after the capture
+        (e.g. .to(), .cuda(), assigning param.data or load_state_dict()
+        with different tensors) must call it, otherwise the replayed
+        graph silently keeps using the old memory.
+        """
+        self._cuda_graph = None
+        self._static_inputs, self._static_labels = None, None
+        self._static_outputs, self._static_loss = None, None
+
+    def cuda_graph_compatible(self, inputs, labels):
+        """
+        Returns True if a training batch can be processed with
+        forward_backward_cuda_graph().
+
+        The graph is captured for fixed input/label sizes; batches with a
+        different size (e.g. the last batch of an epoch) should be
+        processed without it.
+
+        Args:
+            inputs, labels (torch.Tensor):
+                batch of samples.
+        """
+        if not (self.use_cuda_graph and self.training and inputs.is_cuda):
+            return False
+
+        if self._cuda_graph is None:
+            return True
+
+        return (inputs.size() == self._static_inputs.size() and
+                labels.size() == self._static_labels.size())
+
+    def forward_backward_cuda_graph(self, inputs, labels, criterion):
+        """
+        Forwards a training batch and computes the gradients of the data
+        fidelity loss by replaying a CUDA graph, which launches all the
+        (many and small) kernels of the forward/backward pass at once.
+
+        The graph is captured at the first call. The parameter gradients
+        are then overwritten (not accumulated) at each replay, so further
+        losses (e.g. regularization) can be backpropagated afterwards, as
+        usual. Gradients should be zeroed with set_to_none=False.
+
+        Args:
+            inputs, labels (torch.Tensor):
+                batch of samples.
+            criterion (nn.Module):
+                data fidelity loss.
+
+        Returns:
+            outputs (torch.Tensor)
+            data_fidelity (0d Tensor):
+                These are static tensors of the graph, which are
+                overwritten at the next replay.
+        """
+        if self._cuda_graph is None:
+            self._capture_cuda_graph(inputs, labels, criterion)
+
+        self._static_inputs.copy_(inputs)
+        self._static_labels.copy_(labels)
+        self._cuda_graph.replay()
+
+        return self._static_outputs, self._static_loss
+
+    def _capture_cuda_graph(self, inputs, labels, criterion, num_warmup=3):
+        """
+        Captures the forward/backward pass of a training batch in a
+        CUDA graph, with static input/output buffers.
+
+        The warmup iterations run the network in training mode on the
+        given batch. The batch norm running statistics are restored
+        afterwards, but the warmup still draws random numbers (e.g. for
+        dropout layers), which shifts the random number generator state.
+        If the capture fails, the graph is discarded and the error is
+        raised.
+
+        Args:
+            inputs, labels (torch.Tensor):
+                batch of samples (used for the warmup iterations).
+            criterion (nn.Module):
+                data fidelity loss.
+            num_warmup (int):
+                number of eager iterations before capture.
+        """
+        static_inputs = inputs.clone()
+        static_labels = labels.clone()
+
+        # batch norm buffers (running_mean, running_var,
+        # num_batches_tracked), updated by the warmup iterations.
+        batchnorm_buffers = [
+            (buffer, buffer.clone())
+            for module in self.modules_by_type()['batchnorm']
+            for buffer in module.buffers(recurse=False)
+        ]
+
+        # The python garbage collector is frozen (and disabled) during
+        # warmup and capture, which would otherwise be slowed down by
+        # collections scanning all the existing (long-lived) objects.
+        gc.collect()
+        gc.freeze()
+        gc_enabled = gc.isenabled()
+        gc.disable()
+
+        try:
+            # warmup on a side stream (required before capture)
+            stream = torch.cuda.Stream()
+            stream.wait_stream(torch.cuda.current_stream())
+            try:
+                with torch.cuda.stream(stream):
+                    for _ in range(num_warmup):
+                        outputs = self(static_inputs)
+                        criterion(outputs, static_labels).backward()
+            finally:
+                torch.cuda.current_stream().wait_stream(stream)
+                with torch.no_grad():
+                    for buffer, saved_buffer in batchnorm_buffers:
+                        buffer.copy_(saved_buffer)
+
+            # gradients are allocated from the graph's private memory pool
+            self.zero_grad(set_to_none=True)
+
+            # kernels are only recorded (not run) during capture
+            cuda_graph = torch.cuda.CUDAGraph()
+            with torch.cuda.graph(cuda_graph):
+                static_outputs = self(static_inputs)
+                static_loss = criterion(static_outputs, static_labels)
+                static_loss.backward()
+        except BaseException:
+            self.reset_cuda_graph()
+            raise
+        finally:
+            gc.unfreeze()
+            if gc_enabled:
+                gc.enable()
+
+        # only set once the capture succeeded
+        self._static_inputs, self._static_labels = \
+            static_inputs, static_labels
+        self._static_outputs, self._static_loss = static_outputs, static_loss
+        self._cuda_graph = cuda_graph
+
     ##########################################################################
     # Deepsplines: regularization and sparsification
 
@@ -328,36 +592,69 @@ class BaseModel(nn.Module):
             l2sqsum (0d Tensor):
                 l2sqsum = (sum(weights^2) + sum(biases^2))
         """
-        l2sqsum = Tensor([0.]).to(self.device)
+        # l2 norms of all weights/biases with a single multi-tensor kernel
+        l2norms = torch._foreach_norm(self.weights_biases(), 2)
+        l2sqsum = torch.stack(l2norms).pow(2).sum()
+
+        return l2sqsum
+
+    def deepspline_relu_slopes(self):
+        """
+        Returns the ReLU slopes of all deepspline activations in the network,
+        concatenated along the activations dimension.
+
+        For deepBsplines whose activation layers all have the same spline
+        size and grid (hence D2 filter), the coefficients of all the layers
+        are concatenated and filtered with a single convolution
+        (see DeepBSplineBase.relu_slopes), instead of one per layer.
+
+        Returns:
+            relu_slopes (torch.Tensor):
+                size: (total number of activations, spline_size - 2)
+                (empty if there are no deepspline activations);
+                flattened if the layers have different spline sizes.
+        """
+        modules = list(self.modules_deepspline())
+        if len(modules) == 0:
+            return torch.zeros((0, self.spline_size - 2), device=self.device)
+
+        same_size = all(module.size == modules[0].size for module in modules)
 
-        for module in self.modules():
-            if hasattr(module, 'weight') and \
-                    isinstance(module.weight, nn.Parameter):
-                l2sqsum = l2sqsum + module.weight.pow(2).sum()
+        if issubclass(self.deepspline, DeepBSplineBase) and same_size:
+            if self._deepsplines_share_grid is None:
+                # checked once (the grids are fixed), to avoid a
+                # host-device synchronization at every call
+                self._deepsplines_share_grid = all(
+                    torch.equal(module.grid, modules[0].grid)
+                    for module in modules)
 
-            if hasattr(module, 'bias') and \
-                    isinstance(module.bias, nn.Parameter):
-                l2sqsum = l2sqsum + module.bias.pow(2).sum()
+            if self._deepsplines_share_grid:
+                coefficients = torch.cat([module.coefficients
+                                          for module in modules])
+                return F.conv1d(coefficients.unsqueeze(1),
+                                modules[0].D2_filter).squeeze(1)
 
-        return l2sqsum[0]  # 1-tap 1d tensor -> 0d tensor
+        if same_size:
+            return torch.cat([module.relu_slopes for module in modules])
+
+        return torch.cat([module.relu_slopes.reshape(-1)
+                          for module in modules])
 
     def TV2(self):
         """
         Computes the sum of the TV(2) (second-order total-variation)
         semi-norm of all deepspline activations in the network.
 
+        Since TV(2)(deepspline) = ||a||_1, this is the l1 norm of all
+        the ReLU slopes (see deepspline_relu_slopes()).
+
         Returns:
             tv2 (0d Tensor):
                 tv2 = sum(TV(2))
         """
-        tv2 = Tensor([0.]).to(self.device)
+        tv2 = self.deepspline_relu_slopes().abs().sum()
 
-        for module in self.modules():
-            if isinstance(module, self.deepspline):
-                module_tv2 = module.totalVariation(mode='additive')
-                tv2 = tv2 + module_tv2.norm(p=1)
-
-        return tv2[0]  # 1-tap 1d tensor -> 0d tensor
+        return tv2
 
     def BV2(self):
         """
@@ -371,15 +668,14 @@ class BaseModel(nn.Module):
             bv2 (0d Tensor):
                 bv2 = sum(BV(2))
         """
-        bv2 = Tensor([0.]).to(self.device)
+        # All terms are non-negative:
+        # sum(BV(2)) = sum(TV(2)) + sum(|f(0)| + |f(1)|)
+        bv2 = self.TV2()
 
-        for module in self.modules():
-            if isinstance(module, self.deepspline):
-                module_tv2 = module.totalVariation(mode='additive')
-                module_bv2 = module_tv2 + module.fZerofOneAbs(mode='additive')
-                bv2 = bv2 + module_bv2.norm(p=1)
+        for module in self.modules_deepspline():
+            bv2 = bv2 + module.fZerofOneAbs(mode='additive').sum()
 
-        return bv2[0]  # 1-tap 1d tensor -> 0d tensor
+        return bv2
 
     def lipschitz_bound(self):
         """
@@ -401,24 +697,21 @@ class BaseModel(nn.Module):
             lip_bound (0d Tensor):
                 global lipschitz bound of the network
         """
-        bv_product = Tensor([1.]).to(self.device)
-        max_weights_product = Tensor([1.]).to(self.device)
+        # 0d tensors, multiplied together at the end
+        factors = []
 
-        for module in self.modules():
-            if isinstance(module, self.deepspline):
-                module_tv = module.totalVariation()
-                module_fzero_fone = module.fZerofOneAbs()
-                bv_product = bv_product * \
-                    (module_tv.sum() + module_fzero_fone.sum())
+        for module in self.modules_deepspline():
+            module_tv = module.totalVariation()
+            module_fzero_fone = module.fZerofOneAbs()
+            factors.append(module_tv.sum() + module_fzero_fone.sum())
 
-            elif isinstance(module, nn.Linear) or \
-                    isinstance(module, nn.Conv2d):
-                max_weights_product = max_weights_product * \
-                    module.weight.data.abs().max()
+        modules_by_type = self.modules_by_type()
+        for module in modules_by_type['conv'] + modules_by_type['linear']:
+            factors.append(module.weight.data.abs().max())
 
-        lip_bound = max_weights_product * bv_product
+        lip_bound = torch.stack(factors).prod()
 
-        return lip_bound[0]  # 1-tap 1d tensor -> 0d tensor
+        return lip_bound
 
     def sparsify_activations(self):
         """
@@ -428,9 +721,11 @@ class BaseModel(nn.Module):
         Note that deepspline(x) = sum_k [a_k * ReLU(x-kT)] + (b1*x + b0)
         This function sets a_k to zero if |a_k| < knot_threshold.
         """
-        for module in self.modules():
-            if isinstance(module, self.deepspline):
-                module.apply_threshold(self.knot_threshold)
+        for module in self.modules_deepspline():
+            module.apply_threshold(self.knot_threshold)
+
+        # the activation coefficients were reallocated
+        self.reset_cuda_graph()
 
     def compute_sparsity(self):
         """
@@ -441,11 +736,10 @@ class BaseModel(nn.Module):
             sparsity (int)
         """
         sparsity = 0
-        for module in self.modules():
-            if isinstance(module, self.deepspline):
-                module_sparsity, _ = \
-                    module.get_threshold_sparsity(self.knot_threshold)
-                sparsity += module_sparsity.sum().item()
+        for module in self.modules_deepspline():
+            module_sparsity, _ = \
+                module.get_threshold_sparsity(self.knot_threshold)
+            sparsity += module_sparsity.sum().item()
 
         return sparsity
 
@@ -462,8 +756,9 @@ class BaseModel(nn.Module):
                   'coefficients': deepspline coefficients,
                   'threshold_sparsity_mask': mask indicating (non-zero) knots}
         """
+        names, locations_list, coefficients_list, masks_list = [], [], [], []
+
         with torch.no_grad():
-            activations_list = []
             for name, module in self.named_modules():
 
                 if isinstance(module, self.deepspline):
@@ -485,15 +780,46 @@ class BaseModel(nn.Module):
                     _, threshold_sparsity_mask = \
                         module.get_threshold_sparsity(self.knot_threshold)
 
-                    activations_list.append({
-                        'name':
-                        '_'.join([name, module.mode]),
-                        'locations':
-                        locations.clone().detach().cpu(),
-                        'coefficients':
-                        coefficients.clone().detach().cpu(),
-                        'sparsity_mask':
-                        threshold_sparsity_mask.cpu()
-                    })
+                    names.append('_'.join([name, module.mode]))
+                    locations_list.append(locations)
+                    coefficients_list.append(coefficients)
+                    masks_list.append(threshold_sparsity_mask)
+
+            if len(names) == 0:
+                return []
+
+            # All activations have the same size. Their locations and
+            # coefficients (resp. sparsity masks) are concatenated to do a
+            # single (asynchronous, if on gpu) device to host copy.
+            num_activations = [mask.size(0) for mask in masks_list]
+            values = torch.stack((torch.cat(locations_list),
+                                  torch.cat(coefficients_list)))
+            masks = torch.cat(masks_list)
+
+            if values.is_cuda:
+                values_cpu = torch.empty(values.size(),
+                                         dtype=values.dtype,
+                                         pin_memory=True)
+                values_cpu.copy_(values, non_blocking=True)
+                masks_cpu = torch.empty(masks.size(),
+                                        dtype=masks.dtype,
+                                        pin_memory=True)
+                masks_cpu.copy_(masks, non_blocking=True)
+                torch.cuda.current_stream().synchronize()
+            else:
+                values_cpu, masks_cpu = values, masks
+
+        activations_list = []
+        for name, locations, coefficients, mask in \
+                zip(names,
+                    values_cpu[0].split(num_activations),
+                    values_cpu[1].split(num_activations),
+                    masks_cpu.split(num_activations)):
+            activations_list.append({
+                'name': name,
+                'locations': locations,
+                'coefficients': coefficients,
+                'sparsity_mask': mask
+            })
 
         return activations_list
@@ -87,4 +87,4 @@ class DeepBSpline(DeepBSplineBase):
         s = ('mode={mode}, num_activations={num_activations}, '
              'init={init}, size={size}, grid={grid[0]}.')
 
-        return s.format(**self.__dict__)
+        return s.format(**self.__dict__, grid=self.grid)
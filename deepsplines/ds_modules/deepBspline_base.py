@@ -30,9 +30,23 @@ TV(2)(deepsline) = ||a||_1 = ||Lc||_1
 
 The save_memory flag allows one to use a more memory efficient
 version at the expense of additional running time.
+In this version, the linear extrapolations are computed inside the
+autograd function DeepBSpline_Func, as a linear interpolation with fracs
+outside [0, 1], so that no additional tensors are saved for them, and
+only the input is saved for the backward pass (the B-spline indexes and
+fracs are recomputed from it).
+
+Tensors saved for the backward pass of a deepBspline activation,
+in bytes per (single precision) input element:
+- save_memory=False: 13 (uint8 fracs and int32 indexes, in
+  DeepBSpline_Func, + 8 for the linear extrapolations);
+- save_memory=True: 4 (the input).
 
 Memory usage & running time for training a ResNet32
-for 5 epochs on the CIFAR dataset:
+for 5 epochs on the CIFAR dataset, measured with an earlier version
+which saved 20 bytes per input element with save_memory=False
+(float32 fracs, int64 indexes and extrapolations) and 4 with
+save_memory=True:
 
 ReLU:
 - 2009 MB
@@ -48,6 +62,7 @@ deepBspline without custom Autograd Fuction:
 - 2043 seconds
 """
 
+import importlib.util
 import torch
 import torch.nn.functional as F
 from torch import Tensor
@@ -55,6 +70,80 @@ from abc import abstractproperty
 
 from deepsplines.ds_modules.deepspline_base import DeepSplineBase
 
+# Number of bits with which (non double precision) fracs, in [0, 1), are
+# saved for the backward pass of DeepBSpline_Func (save_memory=False):
+# - 8: uint8 fixed-point (255 levels);
+# - 16: bfloat16 (for single precision inputs);
+# - 32: no conversion.
+# (With save_memory=True, only x is saved and fracs are recomputed.)
+FRAC_QUANT_BITS = 8
+
+# If True, the save_memory=False version of the activation and the
+# coefficient gradients are compiled with torch.compile for CUDA inputs
+# (see fused_deepBspline_activation and fused_coefficients_grad).
+# Disabled by default, since new input configurations (e.g. evaluation
+# under torch.no_grad(), other dtypes) trigger compilations in the middle
+# of training.
+USE_TORCH_COMPILE = False
+
+# torch.compile generates Triton kernels for CUDA inputs.
+TORCH_COMPILE_AVAILABLE = importlib.util.find_spec('triton') is not None
+
+
+def bspline_indexes_fracs(x, grid, zero_knot_indexes, left_bound,
+                          right_bound, extrapolate):
+    """
+    Computes the indexes (in coefficients_vect) of the left coefficients
+    and the distances to them (fracs, in grid units), for each input.
+
+    Args:
+        x (torch.Tensor):
+            4D input (N, num_activations, H, W).
+        extrapolate (bool):
+            If True, fracs are computed with x instead of the clamped x,
+            so that the linear interpolation also gives the linear
+            extrapolations outside the B-spline range
+            (see DeepBSpline_Func).
+        (see DeepBSpline_Func for the remaining arguments)
+
+    Returns:
+        indexes (torch.Tensor):
+            int32 indexes, same size as x.
+        fracs (torch.Tensor):
+            same size as x; in [0, 1) if extrapolate is False.
+    """
+    # First, we clamp the input to the range
+    # [leftmost coefficient, second righmost coefficient].
+    # We have to clamp, on the right, to the second righmost coefficient,
+    # so that we always have a coefficient to the right of x_clamped to
+    # compute its output. For the values outside the range,
+    # linearExtrapolations will add what remains to compute the final
+    # output of the activation, taking into account the slopes
+    # on the left and right.
+    # The bounds are (0d) tensors to avoid device-host synchronizations.
+    x_clamped = torch.minimum(torch.maximum(x, left_bound), right_bound)
+
+    floored_x = torch.floor(x_clamped / grid)  # left coefficient
+
+    if extrapolate is False:
+        # distance to left coefficient
+        fracs = x_clamped / grid - floored_x
+    else:
+        # The linear extrapolations outside the B-spline range are a
+        # linear interpolation between the two leftmost (resp. second
+        # rightmost and rightmost) coefficients with fracs < 0
+        # (resp. > 1). Hence, they are included in the B-spline
+        # expansion by using the distance of x (not x_clamped) to the
+        # left coefficient.
+        fracs = x / grid - floored_x
+
+    # This gives the indexes (in coefficients_vect) of the left
+    # coefficients. int32 is enough, since they are smaller than
+    # num_activations * size.
+    indexes = zero_knot_indexes + floored_x.to(torch.int32)
+
+    return indexes, fracs
+
 
 class DeepBSpline_Func(torch.autograd.Function):
     """
@@ -62,124 +151,201 @@ class DeepBSpline_Func(torch.autograd.Function):
     used to calculate output = activation(input), for each element of the
     input.
 
-    If save_memory=True, use a memory efficient version at the expense of
-    additional running time. (see module's docstring for details)
+    If save_memory=True, the linear extrapolations outside the B-spline
+    range are also computed in this function, and only x is saved for the
+    backward pass, which saves memory at the expense of additional
+    running time. (see module's docstring for details)
     """
     @staticmethod
-    def forward(ctx, x, coefficients_vect, grid, zero_knot_indexes, size,
-                save_memory):
-
-        # First, we clamp the input to the range
-        # [leftmost coefficient, second righmost coefficient].
-        # We have to clamp, on the right, to the second righmost coefficient,
-        # so that we always have a coefficient to the right of x_clamped to
-        # compute its output. For the values outside the range,
-        # linearExtrapolations will add what remains to compute the final
-        # output of the activation, taking into account the slopes
-        # on the left and right.
-        x_clamped = x.clamp(min=-(grid.item() * (size // 2)),
-                            max=(grid.item() * (size // 2 - 1)))
-
-        floored_x = torch.floor(x_clamped / grid)  # left coefficient
-        fracs = x_clamped / grid - floored_x  # distance to left coefficient
-
-        # This gives the indexes (in coefficients_vect) of the left
-        # coefficients
-        indexes = (zero_knot_indexes.view(1, -1, 1, 1) + floored_x).long()
+    def forward(ctx, x, coefficients_vect, grid, zero_knot_indexes,
+                left_bound, right_bound, save_memory):
+
+        indexes, fracs = bspline_indexes_fracs(x, grid, zero_knot_indexes,
+                                               left_bound, right_bound,
+                                               save_memory)
+        # (with save_memory=True, fracs include the linear extrapolations)
 
         # Only two B-spline basis functions are required to compute the output
         # (through linear interpolation) for each input in the B-spline range.
-        activation_output = coefficients_vect[indexes + 1] * fracs + \
-            coefficients_vect[indexes] * (1 - fracs)
+        # The (left, right) coefficients are read with a single gather from
+        # a table of consecutive coefficient pairs. size: (..., 2)
+        # (indexes have the strides of x, which might not be contiguous,
+        # e.g. channels_last, hence reshape() instead of view())
+        coefficients_pairs = torch.stack((coefficients_vect[:-1],
+                                          coefficients_vect[1:]), dim=1)
+        coefficients_lr = coefficients_pairs.index_select(
+            0, indexes.reshape(-1)).view(*indexes.size(), 2)
+        activation_output = coefficients_lr[..., 1] * fracs + \
+            coefficients_lr[..., 0] * (1 - fracs)
 
         ctx.save_memory = save_memory
 
         if save_memory is False:
+            # fracs are only used to weight grad_out in the backward pass,
+            # so they are saved with reduced precision
+            # (see FRAC_QUANT_BITS).
+            if fracs.dtype != torch.float64:
+                if FRAC_QUANT_BITS == 8:
+                    fracs = fracs.mul(255).round_().to(torch.uint8)
+                elif FRAC_QUANT_BITS == 16 and \
+                        fracs.dtype == torch.float32:
+                    fracs = fracs.to(torch.bfloat16)
+
             ctx.save_for_backward(fracs, coefficients_vect, indexes, grid)
         else:
-            ctx.size = size
+            # only save x (same size as fracs and indexes, but a single
+            # tensor); fracs and indexes are recomputed in the backward pass
             ctx.save_for_backward(x, coefficients_vect, grid,
-                                  zero_knot_indexes)
-
-            # compute leftmost and rightmost slopes for linear extrapolations
-            # outside B-spline range
-            num_activations = x.size(1)
-            coefficients = coefficients_vect.view(num_activations, size)
-            leftmost_slope = (coefficients[:, 1] - coefficients[:, 0])\
-                .div(grid).view(1, -1, 1, 1)
-            rightmost_slope = (coefficients[:, -1] - coefficients[:, -2])\
-                .div(grid).view(1, -1, 1, 1)
-
-            # peform linear extrapolations outside B-spline range
-            leftExtrapolations = (x.detach() + grid * (size // 2))\
-                .clamp(max=0) * leftmost_slope
-            rightExtrapolations = (x.detach() - grid * (size // 2 - 1))\
-                .clamp(min=0) * rightmost_slope
-            # linearExtrapolations is zero for inputs inside B-spline range
-            linearExtrapolations = leftExtrapolations + rightExtrapolations
-
-            # add linear extrapolations to B-spline expansion
-            activation_output = activation_output + linearExtrapolations
+                                  zero_knot_indexes, left_bound, right_bound)
 
         return activation_output
 
     @staticmethod
     def backward(ctx, grad_out):
 
-        save_memory = ctx.save_memory
-
-        if save_memory is False:
+        if ctx.save_memory is False:
             fracs, coefficients_vect, indexes, grid = ctx.saved_tensors
+            if fracs.dtype == torch.uint8:
+                fracs = fracs.to(grad_out.dtype) * (1. / 255.)
+            else:
+                fracs = fracs.to(grad_out.dtype)
         else:
-            size = ctx.size
-            x, coefficients_vect, grid, zero_knot_indexes = ctx.saved_tensors
+            x, coefficients_vect, grid, zero_knot_indexes, \
+                left_bound, right_bound = ctx.saved_tensors
 
             # compute fracs and indexes again (do not save them in ctx)
             # to save memory
-            x_clamped = x.clamp(min=-(grid.item() * (size // 2)),
-                                max=(grid.item() * (size // 2 - 1)))
-
-            floored_x = torch.floor(x_clamped / grid)  # left coefficient
-            # distance to left coefficient
-            fracs = x_clamped / grid - floored_x
-
-            # This gives the indexes (in coefficients_vect) of the left
-            # coefficients
-            indexes = (zero_knot_indexes.view(1, -1, 1, 1) + floored_x).long()
-
-        grad_x = (coefficients_vect[indexes + 1] -
-                  coefficients_vect[indexes]) / grid * grad_out
-
-        # Next, add the gradients with respect to each coefficient, such that,
-        # for each data point, only the gradients wrt to the two closest
-        # coefficients are added (since only these can be nonzero).
-
-        grad_coefficients_vect = torch.zeros_like(coefficients_vect)
-        # right coefficients gradients
-        grad_coefficients_vect.scatter_add_(0,
-                                            indexes.view(-1) + 1,
-                                            (fracs * grad_out).view(-1))
-        # left coefficients gradients
-        grad_coefficients_vect.scatter_add_(0, indexes.view(-1),
-                                            ((1 - fracs) * grad_out).view(-1))
-
-        if save_memory is True:
-            # Add gradients from the linear extrapolations
-            tmp1 = ((x.detach() + grid * (size // 2)).clamp(max=0)) / grid
-            grad_coefficients_vect.scatter_add_(0, indexes.view(-1),
-                                                (-tmp1 * grad_out).view(-1))
-            grad_coefficients_vect.scatter_add_(0,
-                                                indexes.view(-1) + 1,
-                                                (tmp1 * grad_out).view(-1))
-
-            tmp2 = ((x.detach() - grid * (size // 2 - 1)).clamp(min=0)) / grid
-            grad_coefficients_vect.scatter_add_(0, indexes.view(-1),
-                                                (-tmp2 * grad_out).view(-1))
-            grad_coefficients_vect.scatter_add_(0,
-                                                indexes.view(-1) + 1,
-                                                (tmp2 * grad_out).view(-1))
-
-        return grad_x, grad_coefficients_vect, None, None, None, None
+            indexes, fracs = bspline_indexes_fracs(x, grid,
+                                                   zero_knot_indexes,
+                                                   left_bound, right_bound,
+                                                   True)
+
+        # single gather from the differences of consecutive coefficients
+        coefficients_diff = coefficients_vect[1:] - coefficients_vect[:-1]
+        grad_x = coefficients_diff.index_select(0, indexes.reshape(-1))\
+            .view_as(indexes) / grid * grad_out
+
+        # filled (and zeroed) by coefficients_grad()
+        grad_coefficients_vect = torch.empty_like(coefficients_vect)
+
+        if grad_out.is_cuda and USE_TORCH_COMPILE and \
+                fused_coefficients_grad is not None:
+            grad_coefficients_vect = fused_coefficients_grad(
+                grad_coefficients_vect, indexes, fracs, grad_out)
+        else:
+            grad_coefficients_vect = coefficients_grad(grad_coefficients_vect,
+                                                       indexes, fracs,
+                                                       grad_out)
+
+        return grad_x, grad_coefficients_vect, None, None, None, None, None
+
+
+def coefficients_grad(grad_coefficients_vect, indexes, fracs, grad_out):
+    """
+    Computes the gradients with respect to the B-spline coefficients,
+    in place in grad_coefficients_vect.
+
+    For each data point, only the gradients wrt to the two closest
+    coefficients are added (since only these can be nonzero):
+    (1 - fracs) * grad_out for the left coefficient and
+    fracs * grad_out for the right one.
+
+    Args:
+        grad_coefficients_vect (torch.Tensor):
+            output buffer, of the same size as the B-spline vectorized
+            coefficients (its previous values are discarded).
+        indexes (torch.Tensor):
+            indexes (in coefficients_vect) of the left coefficients.
+        fracs (torch.Tensor):
+            distance to the left coefficients (in grid units).
+        grad_out (torch.Tensor)
+
+    Returns:
+        grad_coefficients_vect (torch.Tensor)
+    """
+    # index_add_ (unlike scatter_add_) accepts the int32 indexes directly
+    indexes = indexes.reshape(-1)
+    grad_right = (fracs * grad_out).reshape(-1)
+    grad_left = grad_out.reshape(-1) - grad_right  # (1 - fracs) * grad_out
+
+    grad_coefficients_vect.zero_()
+    # right coefficients gradients (indexes + 1, through a shifted view)
+    grad_coefficients_vect[1:].index_add_(0, indexes, grad_right)
+    # left coefficients gradients
+    grad_coefficients_vect.index_add_(0, indexes, grad_left)
+
+    return grad_coefficients_vect
+
+
+# Compiled version of coefficients_grad(), used for CUDA inputs if enabled
+# (see USE_TORCH_COMPILE), to fuse the weights computation with the
+# index_add_ calls.
+if TORCH_COMPILE_AVAILABLE:
+    fused_coefficients_grad = torch.compile(coefficients_grad, dynamic=True)
+else:
+    fused_coefficients_grad = None
+
+
+def deepBspline_activation(x, coefficients_vect, grid, zero_knot_indexes,
+                           left_bound, right_bound, inv_grid):
+    """
+    Computes the deepBspline activation (save_memory=False version):
+    B-spline expansion (DeepBSpline_Func) + linear extrapolations.
+
+    Args:
+        x (torch.Tensor):
+            4D input (N, num_activations, H, W).
+        inv_grid (0d torch.Tensor):
+            1 / grid.
+        (see DeepBSpline_Func for the remaining arguments)
+
+    Returns:
+        output (torch.Tensor)
+    """
+    output = DeepBSpline_Func.apply(x, coefficients_vect, grid,
+                                    zero_knot_indexes, left_bound,
+                                    right_bound, False)
+
+    # Linear extrapolations:
+    # f(x_left) = leftmost coeff value + \
+    #               left_slope * (x - leftmost coeff)
+    # f(x_right) = second rightmost coeff value + \
+    #               right_slope * (x - second rightmost coeff)
+    # where the first components of the sums (leftmost/second
+    # rightmost coeff value) are taken into account in
+    # DeepBspline_Func() and linearExtrapolations adds the rest.
+
+    coefficients = coefficients_vect.view(x.size(1), -1)
+    size = coefficients.size(1)
+    # The strided views select the columns (0, size-2) and (1, size-1),
+    # so that both slopes are computed at once. size: (num_activations, 2)
+    edge_slopes = (coefficients[:, 1:size:size - 2] -
+                   coefficients[:, 0:size - 1:size - 2]) * inv_grid
+    leftmost_slope = edge_slopes[:, 0].view(1, -1, 1, 1)
+    rightmost_slope = edge_slopes[:, 1].view(1, -1, 1, 1)
+
+    # x.detach(): gradient w/ respect to x is already tracked in
+    # DeepBSpline_Func.
+    # min(x - left_bound, 0) = -relu(left_bound - x) and
+    # max(x - right_bound, 0) = relu(x - right_bound)
+    x = x.detach()
+    leftExtrapolations = -F.relu(left_bound - x) * leftmost_slope
+    rightExtrapolations = F.relu(x - right_bound) * rightmost_slope
+    # linearExtrapolations is zero for inputs inside B-spline range
+    linearExtrapolations = leftExtrapolations + rightExtrapolations
+
+    return output + linearExtrapolations
+
+
+# On GPU, the elementwise operations of deepBspline_activation()
+# (clamp, floor, gathers, interpolation, extrapolations) are each a separate
+# (memory-bound) kernel. If enabled (see USE_TORCH_COMPILE), torch.compile
+# fuses them into a few Triton kernels, in the forward and backward passes.
+if TORCH_COMPILE_AVAILABLE:
+    fused_deepBspline_activation = torch.compile(deepBspline_activation,
+                                                 dynamic=True)
+else:
+    fused_deepBspline_activation = None
 
 
 class DeepBSplineBase(DeepSplineBase):
@@ -205,17 +371,41 @@ class DeepBSplineBase(DeepSplineBase):
 
         self.save_memory = bool(save_memory)
         self.init_zero_knot_indexes()
+        self.init_bounds()
 
-        self.D2_filter = Tensor([1, -2, 1]).view(1, 1, 3).div(self.grid)
+        self.register_buffer('D2_filter',
+                             Tensor([1, -2, 1]).view(1, 1, 3).div(self.grid),
+                             persistent=False)
 
     def init_zero_knot_indexes(self):
         """ Initialize indexes of zero knots of each activation.
         """
-        # self.zero_knot_indexes[i] gives index of knot 0 for filter/neuron_i.
-        # size: (num_activations,)
-        activation_arange = torch.arange(0, self.num_activations)
-        self.zero_knot_indexes = (activation_arange * self.size +
-                                  (self.size // 2))
+        # self.zero_knot_indexes[0, i] gives index of knot 0 for
+        # filter/neuron_i.
+        # size: (1, num_activations, 1, 1), to broadcast with the
+        # (N, num_activations, H, W) input; int32, like the indexes
+        # computed in DeepBSpline_Func.
+        activation_arange = torch.arange(0, self.num_activations,
+                                         dtype=torch.int32)
+        self.register_buffer('zero_knot_indexes',
+                             (activation_arange * self.size +
+                              (self.size // 2)).view(1, -1, 1, 1),
+                             persistent=False)
+
+    def init_bounds(self):
+        """ Initialize the B-spline range bounds and the inverse of
+        the grid (0d tensors).
+
+        Inputs are clamped to [leftmost knot, second rightmost knot]
+        (see DeepBSpline_Func).
+        """
+        grid = self.grid.view(())
+        self.register_buffer('_left_bound', -grid * (self.size // 2),
+                             persistent=False)
+        self.register_buffer('_right_bound', grid * (self.size // 2 - 1),
+                             persistent=False)
+        # to multiply (instead of divide) by the grid in the extrapolations
+        self.register_buffer('_inv_grid', 1. / grid, persistent=False)
 
     @property
     def grid_tensor(self):
@@ -226,8 +416,8 @@ class DeepBSplineBase(DeepSplineBase):
             grid_tensor (torch.Tensor):
                 size: (num_activations, size)
         """
-        grid_arange = torch.arange(-(self.size // 2),
-                                   (self.size // 2) + 1).mul(self.grid)
+        grid_arange = torch.arange(-(self.size // 2), (self.size // 2) + 1,
+                                   device=self.grid.device).mul(self.grid)
 
         return grid_arange.expand((self.num_activations, self.size))
 
@@ -247,13 +437,12 @@ class DeepBSplineBase(DeepSplineBase):
         by doing a valid convolution of the coefficients {c_k}
         with the second-order finite-difference filter [1,-2,1].
         """
-        D2_filter = self.D2_filter.to(device=self.coefficients.device)
-
         # F.conv1d():
         # out(i, 1, :) = D2_filter(1, 1, :) *conv* coefficients(i, 1, :)
         # out.size() = (num_activations, 1, filtered_activation_size)
         # after filtering, we remove the singleton dimension
-        return F.conv1d(self.coefficients.unsqueeze(1), D2_filter).squeeze(1)
+        return F.conv1d(self.coefficients.unsqueeze(1),
+                        self.D2_filter).squeeze(1)
 
     def forward(self, input):
         """
@@ -271,39 +460,22 @@ class DeepBSplineBase(DeepSplineBase):
         assert x.size(1) == self.num_activations, \
             f'{input.size(1)} != {self.num_activations}.'
 
-        grid = self.grid.to(self.coefficients_vect.device)
-        zero_knot_indexes = self.zero_knot_indexes.to(grid.device)
-
-        output = DeepBSpline_Func.apply(x, self.coefficients_vect, grid,
-                                        zero_knot_indexes, self.size,
-                                        self.save_memory)
-
         if self.save_memory is False:
-            # Linear extrapolations:
-            # f(x_left) = leftmost coeff value + \
-            #               left_slope * (x - leftmost coeff)
-            # f(x_right) = second rightmost coeff value + \
-            #               right_slope * (x - second rightmost coeff)
-            # where the first components of the sums (leftmost/second
-            # rightmost coeff value) are taken into account in
-            # DeepBspline_Func() and linearExtrapolations adds the rest.
-
-            coefficients = self.coefficients
-            leftmost_slope = (coefficients[:, 1] - coefficients[:, 0])\
-                .div(grid).view(1, -1, 1, 1)
-            rightmost_slope = (coefficients[:, -1] - coefficients[:, -2])\
-                .div(grid).view(1, -1, 1, 1)
-
-            # x.detach(): gradient w/ respect to x is already tracked in
-            # DeepBSpline_Func
-            leftExtrapolations = (x.detach() + grid * (self.size // 2))\
-                .clamp(max=0) * leftmost_slope
-            rightExtrapolations = (x.detach() - grid * (self.size // 2 - 1))\
-                .clamp(min=0) * rightmost_slope
-            # linearExtrapolations is zero for inputs inside B-spline range
-            linearExtrapolations = leftExtrapolations + rightExtrapolations
-
-            output = output + linearExtrapolations
+            if x.is_cuda and USE_TORCH_COMPILE and \
+                    fused_deepBspline_activation is not None:
+                activation = fused_deepBspline_activation
+            else:
+                activation = deepBspline_activation
+
+            output = activation(x, self.coefficients_vect, self.grid,
+                                self.zero_knot_indexes, self._left_bound,
+                                self._right_bound, self._inv_grid)
+        else:
+            # linear extrapolations are done inside DeepBSpline_Func
+            output = DeepBSpline_Func.apply(x, self.coefficients_vect,
+                                            self.grid, self.zero_knot_indexes,
+                                            self._left_bound,
+                                            self._right_bound, True)
 
         output = self.reshape_back(output, input_size)
 
@@ -318,13 +490,14 @@ class DeepBSplineBase(DeepSplineBase):
         . [a] = L[c], [a] -> sparsification -> [a_hat];
         . [c_hat] = f([a], c_{-L}, c_{-L+1}).
 
-        This uses a well-conditioned iterative method to convert from the
-        deepReLU representation to the B-spline representation
-        (see iterative_relu_slopes_to_coefficients()).
-        This is required so that we can do (b0,b1,[a])->[c]->[a']
-        while keeping the same zero slopes in [a] and [a'].
-        This is not the case if we compute [a'] = L(P(b0,b1,[a])), where
-        P is a matrix that maps (b0,b1,[a]) to [c], due to ill-conditioning.
+        The deepReLU representation is converted to the B-spline
+        representation with a closed-form expression computed in double
+        precision (see relu_slopes_to_coefficients()).
+        The precision is required so that we can do (b0,b1,[a])->[c]->[a']
+        while keeping the same zero slopes in [a] and [a']: the mapping
+        (b0,b1,[a]) -> [c] is ill-conditioned (the rounding errors grow
+        with the coefficient index), so in single precision the sparsified
+        slopes would not be exactly recovered.
 
         Args:
             threshold (float)
@@ -332,13 +505,13 @@ class DeepBSplineBase(DeepSplineBase):
         with torch.no_grad():
             new_relu_slopes = super().apply_threshold(threshold)
             self.coefficients_vect.data = \
-                self.iterative_relu_slopes_to_coefficients(new_relu_slopes)\
-                .view(-1)
+                self.relu_slopes_to_coefficients(new_relu_slopes).view(-1)
 
-    def iterative_relu_slopes_to_coefficients(self, relu_slopes):
+    @torch.no_grad()
+    def relu_slopes_to_coefficients(self, relu_slopes):
         """
-        Get the (B-spline) coefficients from relu coefficients in an
-        iterative and well-conditioned manner.
+        Get the (B-spline) coefficients from relu coefficients in closed
+        form (in double precision).
 
         Operations performed:
         . [c_hat] = f([a], c_{-L}, c_{-L+1}).
@@ -350,16 +523,32 @@ class DeepBSplineBase(DeepSplineBase):
         of coefficients ([c], [c']) that are related by a linear term give
         the same ReLU coefficients [a].
 
+        The recursion c[i] = 2c[i-1] - c[i-2] + T*a[i-2] (i >= 2) is solved
+        in closed form, without a loop over the coefficients:
+        c[i] = c[0] + i*(c[1] - c[0]) + T * sum_{j=0}^{i-2} (i-1-j)*a[j],
+        where the last sum is a double cumulative sum of [a]. It is computed
+        in double precision so that rounding errors do not accumulate along
+        the coefficients.
+
         Args:
             relu_slopes (torch.Tensor)
         """
-        coefficients = self.coefficients
-        coefficients[:, 2::] = 0.  # first two coefficients remain the same
-        grid = self.grid.to(coefficients.device)
+        coefficients = self.coefficients.double()
+        first_coeff = coefficients[:, 0:1]  # first two coefficients
+        second_coeff = coefficients[:, 1:2]  # remain the same
+
+        knot_arange = torch.arange(self.size,
+                                   dtype=coefficients.dtype,
+                                   device=coefficients.device)
+        # size: (num_activations, size), with two leading zeros
+        relu_slopes_cumsum2 = F.pad(
+            relu_slopes.double().cumsum(dim=1).cumsum(dim=1), (2, 0))
+
+        new_coefficients = first_coeff + \
+            knot_arange * (second_coeff - first_coeff) + \
+            self.grid.double() * relu_slopes_cumsum2
 
-        for i in range(2, self.size):
-            coefficients[:, i] = \
-                (coefficients[:, i - 1] - coefficients[:, i - 2]) \
-                + relu_slopes[:, i - 2].mul(grid) + coefficients[:, i - 1]
+        return new_coefficients.to(self.coefficients.dtype)
 
-        return coefficients
+    # former name (the coefficients used to be computed iteratively)
+    iterative_relu_slopes_to_coefficients = relu_slopes_to_coefficients
@@ -83,7 +83,7 @@ class DeepBSplineExplicitLinear(DeepBSplineBase):
             # size: (num_activations,)
             self.spline_bias = nn.Parameter(spline_bias)
         else:
-            self.spline_bias = spline_bias
+            self.register_buffer('spline_bias', spline_bias, persistent=False)
 
     @property
     def coefficients_vect(self):
@@ -118,7 +118,7 @@ class DeepBSplineExplicitLinear(DeepBSplineBase):
         output = super().forward(input)
 
         x = self.reshape_forward(input)
-        b0 = self.spline_bias.view((1, -1, 1, 1)).to(self.spline_weight.device)
+        b0 = self.spline_bias.view((1, -1, 1, 1))
         b1 = self.spline_weight.view((1, -1, 1, 1))
 
         out_linear = b0 + b1 * x
@@ -132,4 +132,4 @@ class DeepBSplineExplicitLinear(DeepBSplineBase):
         s = ('mode={mode}, num_activations={num_activations}, init={init}, '
              'size={size}, grid={grid[0]}, bias={learn_bias}.')
 
-        return s.format(**self.__dict__)
+        return s.format(**self.__dict__, grid=self.grid)
@@ -168,4 +168,4 @@ class DeepReLUSpline(DeepSplineBase):
         s = ('mode={mode}, num_activations={num_activations}, init={init}, '
              'num_relus={num_relus}, grid={grid[0]}, {bias}: {learn_bias}.')
 
-        return s.format(**self.__dict__)
+        return s.format(**self.__dict__, grid=self.grid)
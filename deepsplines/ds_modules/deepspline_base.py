@@ -71,10 +71,13 @@ class DeepSplineBase(ABC, nn.Module):
         self.init = init
 
         if range_ is None:
-            self.grid = torch.Tensor([float(grid)])
+            grid = float(grid)
         else:
             grid = spline_grid_from_range(size, range_)
-            self.grid = torch.Tensor([grid])
+
+        # non-persistent buffer: follows the module's device without
+        # host-device copies in forward (and stays out of the state_dict).
+        self.register_buffer('grid', torch.Tensor([grid]), persistent=False)
 
     @property
     def device(self):
@@ -205,7 +208,8 @@ class DeepSplineBase(ABC, nn.Module):
 
         Required for the BV(2) regularization.
         """
-        zero_one_vec = torch.tensor([0, 1]).view(-1, 1).to(self.device)
+        # created directly on the module's device (no host-device copy)
+        zero_one_vec = torch.arange(2, device=self.device).view(-1, 1)
         zero_one_vec = zero_one_vec.expand((-1, self.num_activations))
 
         if self.mode == 'conv':
@@ -6,7 +6,6 @@ DeepSpline networks should subclass DSModule.
 
 import torch
 import torch.nn as nn
-from torch import Tensor
 
 from deepsplines.ds_modules.deepBspline import DeepBSpline
 from deepsplines.ds_modules.deepBspline_explicit_linear import (
@@ -102,11 +101,7 @@ class DSModule(nn.Module):
         """
         Returns the total number of network parameters.
         """
-        num_params = 0
-        for param in self.parameters():
-            num_params += torch.numel(param)
-
-        return num_params
+        return sum(param.numel() for param in self.parameters())
 
     def modules_deepspline(self):
         """
@@ -181,18 +176,21 @@ class DSModule(nn.Module):
             l2sqsum (0d Tensor):
                 l2sqsum = (sum(weights^2) + sum(biases^2))
         """
-        l2sqsum = Tensor([0.]).to(self.device)
-
+        weights_biases = []
         for module in self.modules():
             if hasattr(module, 'weight') and \
                     isinstance(module.weight, nn.Parameter):
-                l2sqsum = l2sqsum + module.weight.pow(2).sum()
+                weights_biases.append(module.weight)
 
             if hasattr(module, 'bias') and \
                     isinstance(module.bias, nn.Parameter):
-                l2sqsum = l2sqsum + module.bias.pow(2).sum()
+                weights_biases.append(module.bias)
+
+        # l2 norms of all weights/biases with a single multi-tensor kernel
+        l2norms = torch._foreach_norm(weights_biases, 2)
+        l2sqsum = torch.stack(l2norms).pow(2).sum()
 
-        return l2sqsum[0]  # 1-tap 1d tensor -> 0d tensor
+        return l2sqsum
 
     def TV2(self):
         """
@@ -203,14 +201,14 @@ class DSModule(nn.Module):
             tv2 (0d Tensor):
                 tv2 = sum(TV(2))
         """
-        tv2 = Tensor([0.]).to(self.device)
+        tv2 = torch.zeros((), device=self.device)
 
         for module in self.modules():
             if self.is_deepspline_module(module):
                 module_tv2 = module.totalVariation(mode='additive')
                 tv2 = tv2 + module_tv2.norm(p=1)
 
-        return tv2[0]  # 1-tap 1d tensor -> 0d tensor
+        return tv2
 
     def BV2(self):
         """
@@ -224,7 +222,7 @@ class DSModule(nn.Module):
             bv2 (0d Tensor):
                 bv2 = sum(BV(2))
         """
-        bv2 = Tensor([0.]).to(self.device)
+        bv2 = torch.zeros((), device=self.device)
 
         for module in self.modules():
             if self.is_deepspline_module(module):
@@ -232,7 +230,7 @@ class DSModule(nn.Module):
                 module_bv2 = module_tv2 + module.fZerofOneAbs(mode='additive')
                 bv2 = bv2 + module_bv2.norm(p=1)
 
-        return bv2[0]  # 1-tap 1d tensor -> 0d tensor
+        return bv2
 
     def lipschitz_bound(self):
         """
@@ -254,8 +252,8 @@ class DSModule(nn.Module):
             lip_bound (0d Tensor):
                 global lipschitz bound of the network
         """
-        bv_product = Tensor([1.]).to(self.device)
-        max_weights_product = Tensor([1.]).to(self.device)
+        bv_product = torch.ones((), device=self.device)
+        max_weights_product = torch.ones((), device=self.device)
 
         for module in self.modules():
             if self.is_deepspline_module(module):
@@ -271,7 +269,7 @@ class DSModule(nn.Module):
 
         lip_bound = max_weights_product * bv_product
 
-        return lip_bound[0]  # 1-tap 1d tensor -> 0d tensor
+        return lip_bound
 
     def sparsify_activations(self, knot_threshold):
         """
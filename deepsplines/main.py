@@ -98,6 +98,13 @@ def get_arg_parser():
         '(for deepBsplines only) at the expense of additional running '
         f'time. (default: {default_values["save_memory"]})')
 
+    parser.add_argument(
+        '--use_cuda_graph',
+        action='store_true',
+        help='Capture the forward/backward pass of a training batch in a '
+        'CUDA graph and replay it at each step (GPU only). '
+        f'(default: {default_values["use_cuda_graph"]})')
+
     parser.add_argument(
         '--knot_threshold',
         metavar='[FLOAT,>=0]',
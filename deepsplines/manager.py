@@ -246,12 +246,19 @@ class Manager(Project):
 
         #####
 
+        # Regularization weights, used at every training step
+        # (see forward_backward_train_batch())
+        self.weight_decay_half = self.params['weight_decay'] / 2
+        self.lmbda = self.params['lmbda'] if self.net.using_deepsplines \
+            else 0.
+        self.lipschitz = (self.params['lipschitz'] is True)
+
         # Initialize the losses to log
         # total loss and data fidelity loss
         self.losses_names = ['loss', 'df_loss']
 
-        if self.net.using_deepsplines and self.params['lmbda'] > 0:
-            if self.params['lipschitz'] is True:
+        if self.lmbda > 0:
+            if self.lipschitz is True:
                 self.losses_names.append('bv2_loss')
             else:
                 self.losses_names.append('tv2_loss')
@@ -302,28 +309,33 @@ class Manager(Project):
                 list with the values of the losses corresponding to
                 self.losses_names. len(losses) = len(self.losses_names).
         """
-        outputs = self.net(inputs)
+        if self.net.cuda_graph_compatible(inputs, labels):
+            # forward + data fidelity backward in a single CUDA graph replay
+            outputs, data_fidelity = self.net.forward_backward_cuda_graph(
+                inputs, labels, self.criterion)
+        else:
+            outputs = self.net(inputs)
 
-        data_fidelity = self.criterion(outputs, labels)
+            data_fidelity = self.criterion(outputs, labels)
 
-        if self.net.training is True:
-            data_fidelity.backward()
+            if self.net.training is True:
+                data_fidelity.backward()
 
         losses = [data_fidelity]
 
         regularization = torch.zeros_like(data_fidelity)
-        if self.params['weight_decay'] > 0:
+        if self.weight_decay_half > 0:
             # weight decay regularization
-            wd_regularization = self.params['weight_decay'] / 2 * \
+            wd_regularization = self.weight_decay_half * \
                 self.net.l2sqsum_weights_biases()
             regularization = regularization + wd_regularization
 
-        if self.net.using_deepsplines and self.params['lmbda'] > 0:
+        if self.lmbda > 0:
             # deepspline regularization (TV(2) or BV(2))
-            if self.params['lipschitz'] is True:
-                ds_regularization = self.params['lmbda'] * self.net.BV2()
+            if self.lipschitz is True:
+                ds_regularization = self.lmbda * self.net.BV2()
             else:
-                ds_regularization = self.params['lmbda'] * self.net.TV2()
+                ds_regularization = self.lmbda * self.net.TV2()
 
             losses.append(ds_regularization.clone().detach())
             regularization = regularization + ds_regularization
@@ -446,10 +458,12 @@ class Manager(Project):
 
     def optimizer_zero_grad(self):
         """ Sets parameter gradients to zero """
+        # The gradients of a captured CUDA graph need to keep their memory.
+        set_to_none = not self.net.use_cuda_graph
 
-        self.main_optimizer.zero_grad()
+        self.main_optimizer.zero_grad(set_to_none=set_to_none)
         if self.aux_optimizer is not None:
-            self.aux_optimizer.zero_grad()
+            self.aux_optimizer.zero_grad(set_to_none=set_to_none)
 
     def optimizer_step(self):
         """ Updates parameters """
@@ -8,6 +8,7 @@ default_values = {
     'spline_size': 51,
     'spline_range': 4,
     'save_memory': False,
+    'use_cuda_graph': False,
     'knot_threshold': 0.,
     'num_hidden_layers': 2,
     'num_hidden_neurons': 4,
@@ -72,6 +73,7 @@ structure = {
         'spline_size': None,
         'spline_range': None,
         'save_memory': None,
+        'use_cuda_graph': None,
         'knot_threshold': None,
         'num_hidden_layers': None,
         'num_hidden_neurons': None,
@@ -0,0 +1,159 @@
+"""
+Tests for DeepBSpline_Func (deepsplines/ds_modules/deepBspline_base.py):
+reduced precision fracs saved for the backward pass (see FRAC_QUANT_BITS)
+and non-contiguous inputs.
+
+Run with: python -m unittest discover tests
+"""
+
+import unittest
+import torch
+
+from deepsplines.ds_modules import deepBspline_base
+from deepsplines.ds_modules.deepBspline import DeepBSpline
+
+
+class TestFracsQuantization(unittest.TestCase):
+    """
+    Bounds the error of the coefficient gradients computed with quantized
+    fracs with respect to the ones computed with float32 fracs.
+    """
+    # maximum absolute rounding error of fracs in [0, 1)
+    max_frac_error = {8: 0.5 / 255, 16: 2.**-9}
+
+    def setUp(self):
+        self.frac_quant_bits = deepBspline_base.FRAC_QUANT_BITS
+        torch.manual_seed(0)
+
+    def tearDown(self):
+        deepBspline_base.FRAC_QUANT_BITS = self.frac_quant_bits
+
+    def get_gradients(self, save_memory, frac_quant_bits):
+        """
+        Returns the input and coefficient gradients of a deepBspline
+        activation for inputs inside and (far) outside the B-spline range,
+        together with the module, input and output gradient used.
+        """
+        deepBspline_base.FRAC_QUANT_BITS = frac_quant_bits
+
+        torch.manual_seed(0)
+        module = DeepBSpline('conv',
+                             8,
+                             size=21,
+                             range_=2,
+                             init='leaky_relu',
+                             save_memory=save_memory)
+        with torch.no_grad():
+            module.coefficients_vect.add_(
+                0.1 * torch.randn_like(module.coefficients_vect))
+
+        x = 3 * torch.randn(16, 8, 5, 5)
+        x[0] = 60 * torch.randn(8, 5, 5)  # fracs up to ~600 (in grid units)
+        x.requires_grad_(True)
+
+        output = module(x)
+        grad_out = torch.randn_like(output)
+        output.backward(grad_out)
+
+        return x.grad, module.coefficients_vect.grad, module, x, grad_out
+
+    def test_save_memory_false(self):
+        """ Quantization error bound with fracs in [0, 1). """
+        ref_grad_x, ref_grad_coeffs, module, x, grad_out = \
+            self.get_gradients(False, 32)
+
+        # each input contributes (frac error) * grad_out to the gradients
+        # of its left and right coefficients, in opposite directions.
+        indexes, _ = deepBspline_base.bspline_indexes_fracs(
+            x.detach(), module.grid, module.zero_knot_indexes,
+            module._left_bound, module._right_bound, False)
+        indexes = indexes.view(-1)
+        grad_out_abs = grad_out.abs().view(-1)
+        grad_out_abs_sum = torch.zeros_like(ref_grad_coeffs)
+        grad_out_abs_sum.index_add_(0, indexes, grad_out_abs)
+        grad_out_abs_sum[1:].index_add_(0, indexes, grad_out_abs)
+
+        for frac_quant_bits in [8, 16]:
+            grad_x, grad_coeffs, *_ = self.get_gradients(
+                False, frac_quant_bits)
+
+            self.assertTrue(torch.equal(grad_x, ref_grad_x))
+
+            bound = self.max_frac_error[frac_quant_bits] * \
+                grad_out_abs_sum + 1e-5
+            error = (grad_coeffs - ref_grad_coeffs).abs()
+            self.assertTrue((error <= bound).all(),
+                            f'{frac_quant_bits} bits: max error/bound = '
+                            f'{(error / bound).max().item():.3f}.')
+
+    def test_save_memory_true(self):
+        """ No quantization error: fracs are recomputed from x. """
+        ref_grad_x, ref_grad_coeffs, *_ = self.get_gradients(True, 32)
+
+        for frac_quant_bits in [8, 16]:
+            grad_x, grad_coeffs, *_ = self.get_gradients(
+                True, frac_quant_bits)
+
+            self.assertTrue(torch.equal(grad_x, ref_grad_x))
+            self.assertTrue(torch.equal(grad_coeffs, ref_grad_coeffs))
+
+
+class TestNonContiguousInputs(unittest.TestCase):
+    """
+    Checks that non-contiguous inputs give the same outputs and gradients
+    as contiguous ones, in inference and training.
+    """
+    def get_outputs_gradients(self, module, x):
+        """
+        Returns the output of module(x), and the gradients wrt x and the
+        coefficients, together with the output under torch.no_grad().
+        """
+        with torch.no_grad():
+            output_no_grad = module(x)
+
+        module.zero_grad(set_to_none=True)
+        x = x.detach().requires_grad_(True)
+        output = module(x)
+        output.backward(torch.cos(output.detach()))
+
+        return output_no_grad, output, x.grad, module.coefficients_vect.grad
+
+    def check_inputs(self, mode, x, x_non_contiguous):
+        """ Compares the results of both inputs, for both save_memory. """
+        self.assertFalse(x_non_contiguous.is_contiguous())
+
+        for save_memory in [False, True]:
+            torch.manual_seed(0)
+            module = DeepBSpline(mode,
+                                 8,
+                                 size=21,
+                                 range_=2,
+                                 init='leaky_relu',
+                                 save_memory=save_memory)
+
+            results = self.get_outputs_gradients(module, x)
+            results_non_contiguous = \
+                self.get_outputs_gradients(module, x_non_contiguous)
+
+            for result, result_non_contiguous in \
+                    zip(results, results_non_contiguous):
+                self.assertTrue(
+                    torch.allclose(result, result_non_contiguous, atol=1e-6),
+                    f'save_memory={save_memory}.')
+
+    def test_channels_last(self):
+        """ 'conv' input in channels_last memory format. """
+        torch.manual_seed(0)
+        x = 3 * torch.randn(4, 8, 5, 5)
+        self.check_inputs('conv', x,
+                          x.contiguous(memory_format=torch.channels_last))
+
+    def test_transposed_fc(self):
+        """ Transposed 'fc' input. """
+        torch.manual_seed(0)
+        x = 3 * torch.randn(8, 16)
+        self.check_inputs('fc', x.t().contiguous(), x.t())
+
+
+if __name__ == '__main__':
+    unittest.main()